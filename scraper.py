@@ -4,29 +4,35 @@ SkymoviesHD Movie Scraper - FINAL OPTIMIZED VERSION with concurrency
 Complete scraper with enhanced data extraction
 """
 
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
+import asyncio
+import aiohttp
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from collections import Counter
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Optional
+from selectolax.lexbor import LexborHTMLParser
 import logging
 from datetime import datetime
 import re
 from tqdm import tqdm
-from urllib.parse import urljoin
-import openpyxl
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ============================
 # CONFIGURATION
 # ============================
 BASE_URL = "https://skymovieshd.mba"
 OUTPUT_FILE = f"skymovieshd_movies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-REQUEST_DELAY = 2  # Seconds between requests
 MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3  # Seconds, doubled on each retry
+RETRY_STATUSES = (500, 502, 504)
 TIMEOUT = 30
+CONNECTION_LIMIT = 100  # Total pooled connections
+CONNECTION_LIMIT_PER_HOST = 32  # Kept-alive connections reused per host
+CACHE_NAME = 'skymovies_cache'  # SQLite file for cached responses
+CACHE_EXPIRE_AFTER = 3600  # Seconds before a cached page is fetched again
 SCRAPE_MOVIE_DETAILS = False  # Set to True if you want to visit each movie page for extra details
 
 # Predefined categories
@@ -58,42 +64,91 @@ logger = logging.getLogger(__name__)
 # SESSION SETUP
 # ============================
 def create_session():
-    """Create requests session with retry and browser headers"""
-    session = requests.Session()
-    retry = Retry(
-        total=MAX_RETRIES,
-        read=MAX_RETRIES,
-        connect=MAX_RETRIES,
-        backoff_factor=0.3,
-        status_forcelist=(500, 502, 504)
+    """Create cached aiohttp session with connection pooling and browser headers"""
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=30
+    )
+    cache = SQLiteBackend(
+        CACHE_NAME,
+        expire_after=CACHE_EXPIRE_AFTER,
+        allowed_methods=('GET',)
+    )
+    return CachedSession(
+        cache=cache,
+        connector=connector,
+        # Per-socket timeouts, so time spent queued for a pooled connection is not counted
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=TIMEOUT, sock_read=TIMEOUT),
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+        },
     )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-    })
-    
-    return session
 
 # ================
 # Fetch page 
 # ===============
-def fetch_page(session, url):
-    """Fetch a page and return its HTML or None."""
-    try:
-        r = session.get(url, timeout=TIMEOUT)
-        r.raise_for_status()
-        return url, r.text
-    except Exception as e:
-        logger.warning(f"Error fetching {url}: {e}")
-        return url, None
+async def fetch_page(session, url):
+    """Fetch a page and return its HTML or None, retrying transient failures."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with session.get(url) as r:
+                r.raise_for_status()
+                return url, await r.text(errors='replace')
+        except Exception as e:
+            if isinstance(e, aiohttp.ClientResponseError):
+                retryable = e.status in RETRY_STATUSES
+            else:
+                retryable = isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
+            if retryable and attempt < MAX_RETRIES:
+                await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+                continue
+            logger.warning(f"Error fetching {url}: {e}")
+            return url, None
 
 
+# ============================
+# REGEX PATTERNS
+# ============================
+_YEAR_RE = re.compile(r'\((\d{4})\)')
+_QUALITY_RE = re.compile(r'(720p|1080p|480p|4K|2160p)', re.IGNORECASE)
+_SIZE_RE = re.compile(r'\[([0-9.]+\s?(?:GB|MB))\]', re.IGNORECASE)
+# Year, quality, bracketed and release tags stripped from titles in one pass
+_JUNK_RE = re.compile(
+    r'\(\d{4}\)|720p|1080p|480p|4K|2160p|\[.*?\]|HDRip|BluRay|WEB-DL|HEVC|x264|x265|AAC|ESubs?|ORG\.?|Full|Movie',
+    re.IGNORECASE
+)
+_WS_RE = re.compile(r'\s+')
+_LANG_RE = re.compile(
+    r'\b(Hindi|English|Tamil|Telugu|Bengali|Punjabi|Marathi|Malayalam|Kannada|Gujarati|Urdu|Dual Audio)\b',
+    re.IGNORECASE
+)
+
+# ============================
+# DATA MODEL
+# ============================
+@dataclass(slots=True)
+class MovieRow:
+    """One scraped movie, detail fields are filled only when detail pages are scraped"""
+    category: str
+    title: str
+    year: Optional[str]
+    quality: Optional[str]
+    language: Optional[str]
+    file_size: Optional[str]
+    download_url: str
+    full_title: str
+    genre: Optional[str] = None
+    release_date: Optional[str] = None
+    stars: Optional[str] = None
+    poster_url: Optional[str] = None
+
+DETAIL_COLUMNS = ('genre', 'release_date', 'stars', 'poster_url')
+
 # ============================
 # DATA EXTRACTION
 # ============================
@@ -108,149 +163,180 @@ def extract_movie_info(title_text):
     }
     
     # Year
-    year_match = re.search(r'\((\d{4})\)', title_text)
+    year_match = _YEAR_RE.search(title_text)
     if year_match:
         info['year'] = year_match.group(1)
     
     # Quality (720p focused)
-    quality_match = re.search(r'(720p|1080p|480p|4K|2160p)', title_text, re.IGNORECASE)
+    quality_match = _QUALITY_RE.search(title_text)
     if quality_match:
         info['quality'] = quality_match.group(1)
     
     # File size
-    size_match = re.search(r'\[([0-9.]+\s?(?:GB|MB))\]', title_text, re.IGNORECASE)
+    size_match = _SIZE_RE.search(title_text)
     if size_match:
         info['file_size'] = size_match.group(1)
     
     # Language detection
-    languages = ['Hindi', 'English', 'Tamil', 'Telugu', 'Bengali', 'Punjabi', 
-                 'Marathi', 'Malayalam', 'Kannada', 'Gujarati', 'Urdu', 'Dual Audio']
-    for lang in languages:
-        if lang.lower() in title_text.lower():
-            info['language'] = lang
-            break
+    lang_match = _LANG_RE.search(title_text)
+    if lang_match:
+        info['language'] = lang_match.group(1).title()
     
     # Clean title
-    clean_title = re.sub(r'\(\d{4}\)', '', title_text)
-    clean_title = re.sub(r'(720p|1080p|480p|4K|2160p)', '', clean_title, flags=re.IGNORECASE)
-    clean_title = re.sub(r'\[.*?\]', '', clean_title)
-    clean_title = re.sub(r'(HDRip|BluRay|WEB-DL|HEVC|x264|x265|AAC|ESubs?|ORG\.?|Full|Movie)', '', clean_title, flags=re.IGNORECASE)
-    clean_title = re.sub(r'\s+', ' ', clean_title).strip()
+    clean_title = _JUNK_RE.sub('', title_text)
+    clean_title = _WS_RE.sub(' ', clean_title).strip()
     info['title'] = clean_title
     
     return info
 
-def scrape_movie_detail_page(session, movie_url):
+def parse_movie_detail_page(html):
+    """Extract genre, release date and stars from a movie page"""
+    tree = LexborHTMLParser(html)
+    details = {}
+    
+    # Extract Genre
+    genre_div = tree.css_first('div.L')
+    if genre_div:
+        genre_text = genre_div.text()
+        genre_match = re.search(r'Genre\s*:\s*([^,]+)', genre_text)
+        if genre_match:
+            details['genre'] = genre_match.group(1).strip()
+    
+    # Extract other details from 'Let' class divs
+    let_divs = tree.css('div.Let')
+    for div in let_divs:
+        text = div.text(strip=True)
+        if 'Release Date' in text:
+            date_match = re.search(r'Release Date\s*:\s*(.+)', text)
+            if date_match:
+                details['release_date'] = date_match.group(1).strip()
+        elif 'Stars' in text:
+            stars_match = re.search(r'Stars\s*:\s*(.+)', text)
+            if stars_match:
+                details['stars'] = stars_match.group(1).strip()
+
+    return details
+
+async def scrape_movie_detail_page(session, movie_url):
     """Scrape individual movie page for additional details"""
     try:
-        content = get_page_content(session, movie_url)
+        _, content = await fetch_page(session, movie_url)
         if not content:
             return {}
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        details = {}
-        
-        # Extract Genre
-        genre_div = soup.find('div', class_='L')
-        if genre_div:
-            genre_text = genre_div.get_text()
-            genre_match = re.search(r'Genre\s*:\s*([^,]+)', genre_text)
-            if genre_match:
-                details['genre'] = genre_match.group(1).strip()
-        
-        # Extract other details from 'Let' class divs
-        let_divs = soup.find_all('div', class_='Let')
-        for div in let_divs:
-            text = div.get_text(strip=True)
-            if 'Release Date' in text:
-                date_match = re.search(r'Release Date\s*:\s*(.+)', text)
-                if date_match:
-                    details['release_date'] = date_match.group(1).strip()
-            elif 'Stars' in text:
-                stars_match = re.search(r'Stars\s*:\s*(.+)', text)
-                if stars_match:
-                    details['stars'] = stars_match.group(1).strip()
-        
-        return details
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, parse_movie_detail_page, content)
     except Exception as e:
         logger.warning(f"Error scraping detail page {movie_url}: {str(e)}")
         return {}
 
-def get_page_content(session, url, retries=3):
-    """Fetch page with retry logic"""
-    for attempt in range(retries):
-        try:
-            response = session.get(url, timeout=TIMEOUT)
-            response.raise_for_status()
-            return response.content
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Attempt {attempt + 1}/{retries} failed for {url}: {str(e)}")
-            if attempt < retries - 1:
-                time.sleep(REQUEST_DELAY * (attempt + 1))
-            else:
-                logger.error(f"Failed to fetch {url}")
-                return None
-    return None
+async def scrape_movie_details(session, movies):
+    """Fetch every movie's detail page concurrently and merge the details into its row"""
+    # A movie can be listed in several categories, fetch each page once
+    movie_urls = list(dict.fromkeys(movie.download_url for movie in movies))
+    details = await asyncio.gather(*(scrape_movie_detail_page(session, url) for url in movie_urls))
+    details_by_url = dict(zip(movie_urls, details))
+    
+    for movie in movies:
+        for field, value in details_by_url[movie.download_url].items():
+            setattr(movie, field, value)
 
 # ============================
 # CATEGORY SCRAPING
 # ============================
 
-def scrape_category_page(session, category_url, category_name, max_pages=10, workers=10):
-    base_slug = category_url.rstrip('.html').split('/')[-1]
-    urls = [
-        (i, category_url if i == 1 else f"{category_url.rstrip('.html')}/{i}.html")
-        for i in range(1, max_pages + 1)
-    ]
+def build_page_urls(category_url, max_pages=10):
+    """Return (page_num, url) pairs for the listing pages of a category"""
+    base = category_url[:-5]  # strip '.html'
+    return [(1, category_url)] + [(i, f"{base}/{i}.html") for i in range(2, max_pages + 1)]
 
-    movies = []
-    page_results = []
-    print(f"\n📂 Category: {category_name}")
 
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(fetch_page, session, url): page_num 
-                  for page_num, url in urls}
+def parse_category_page(html, category_name):
+    """Extract movies from a single category listing page"""
+    tree = LexborHTMLParser(html)
+    page_movies = []
 
-        for future in as_completed(futures):
-            page_num = futures[future]
-            page_url, html = future.result()
-            if not html:
-                continue
+    for div in tree.css('div.L[align="left"]'):
+        # Only the first link in a listing block is the movie
+        a = div.css_first('a[href]')
+        href = (a.attributes.get('href') or '') if a else ''
+        if not href or href == 'movie/.html':
+            continue
+
+        title = a.text(strip=True)
+        # Hrefs are site-relative, plain concatenation avoids a full URL parse per row
+        movie_url = href if href.startswith('http') else f"{BASE_URL}/{href.lstrip('/')}"
+        info = extract_movie_info(title)
+
+        page_movies.append(MovieRow(
+            category=category_name,
+            download_url=movie_url,
+            full_title=title,
+            **info
+        ))
 
-            soup = BeautifulSoup(html, 'html.parser')
-            page_movies = []
+    return page_movies
 
-            # Extract movies from this page
-            for div in soup.find_all('div', class_='L', align='left'):
-                a = div.find('a', href=True)
-                if not a or a['href'] == 'movie/.html':
-                    continue
 
-                title = a.get_text(strip=True)
-                href = a['href']
-                movie_url = urljoin(BASE_URL, href)
-                info = extract_movie_info(title)
+def find_last_page(html, category_url):
+    """Return the highest page number linked from a category's pager, or None if there are no pager links"""
+    slug = category_url[:-5].rsplit('/', 1)[-1]
+    page_nums = [int(m.group(1)) for m in re.finditer(rf'/{re.escape(slug)}/(\d+)\.html', html)]
+    return max(page_nums, default=None)
 
-                page_movies.append({
-                    'category': category_name,
-                    'title': info['title'],
-                    'year': info['year'],
-                    'quality': info['quality'],
-                    'language': info['language'],
-                    'file_size': info['file_size'],
-                    'download_url': movie_url,
-                    'full_title': title
-                })
 
-            page_results.append((page_num, page_movies))
+async def parse_listing_page(html, category_name):
+    """Parse a listing page in a worker thread"""
+    # HTML parsing is CPU-bound, run it off the event loop while other fetches continue
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, parse_category_page, html, category_name)
 
-    # Sort by page number and flatten
-    page_results.sort(key=lambda x: x[0])
-    for page_num, page_movies in page_results:
-        movies.extend(page_movies)
 
-    print(f"Completed {category_name}: {len(movies)} movies in page order\n")
-    return movies
+async def scrape_listing_page(session, url, category_name):
+    """Fetch one listing page and parse it in a worker thread"""
+    _, html = await fetch_page(session, url)
+    if not html:
+        return []
+    return await parse_listing_page(html, category_name)
+
+
+async def scrape_category(session, category, max_pages=10):
+    """Scrape a category, probing page 1 for its real page count first.
+
+    Returns the category name and its movies in page order.
+    """
+    category_url, category_name = category['url'], category['name']
+    _, html = await fetch_page(session, category_url)
+    if not html:
+        return category_name, []
+
+    # Only request pages the pager actually links to, capped at max_pages
+    last_page = find_last_page(html, category_url)
+    if last_page is None:
+        logger.warning(f"No pager links found for {category_name}, fetching up to {max_pages} pages")
+        last_page = max_pages
+    last_page = min(last_page, max_pages)
+    pages = await asyncio.gather(
+        parse_listing_page(html, category_name),
+        *(scrape_listing_page(session, url, category_name)
+          for _, url in build_page_urls(category_url, last_page)[1:])
+    )
+    return category_name, [m for page_movies in pages for m in page_movies]
+
+
+async def scrape_categories(session, categories, max_pages=10):
+    """Scrape every category concurrently.
+
+    Returns a dict mapping category name to its movies in page order.
+    """
+    # Categories share one connection pool, so their pages are all in flight together
+    tasks = [scrape_category(session, category, max_pages) for category in categories]
+
+    movies_by_category = {}
+    for future in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Categories", position=0):
+        category_name, movies = await future
+        movies_by_category[category_name] = movies
+
+    return movies_by_category
 
 
 # ============================
@@ -263,41 +349,52 @@ def save_to_excel(data, filename):
     print(f"💾 Saving to Excel: {filename}")
     print(f"{'='*60}")
     
-    df = pd.DataFrame(data)
-    
     columns = ['category', 'title', 'year', 'quality', 'language', 'genre', 
                'file_size', 'release_date', 'stars', 'download_url', 'poster_url', 'full_title']
-    df = df[[col for col in columns if col in df.columns]]
+    columns = [
+        col for col in columns
+        if col not in DETAIL_COLUMNS or any(getattr(movie, col) is not None for movie in data)
+    ]
     
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Movies', index=False)
-        
-        worksheet = writer.sheets['Movies']
-        
-        # Header formatting
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF', size=12)
-        
-        for cell in worksheet[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Column widths
-        widths = {'A': 25, 'B': 40, 'C': 10, 'D': 12, 'E': 15, 'F': 20, 
-                  'G': 12, 'H': 15, 'I': 50, 'J': 50, 'K': 50, 'L': 60}
-        for col, width in widths.items():
-            worksheet.column_dimensions[col].width = width
-        
-        worksheet.freeze_panes = 'A2'
+    # Write-only mode streams rows to disk instead of holding the whole grid
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Movies')
+    
+    # Column widths and frozen header must be set before the first row is written
+    widths = {'A': 25, 'B': 40, 'C': 10, 'D': 12, 'E': 15, 'F': 20, 
+              'G': 12, 'H': 15, 'I': 50, 'J': 50, 'K': 50, 'L': 60}
+    for col, width in widths.items():
+        worksheet.column_dimensions[col].width = width
     
-    print(f"✅ Saved {len(df)} movies")
-    logger.info(f"Saved {len(df)} movies to {filename}")
+    worksheet.freeze_panes = 'A2'
+    
+    # Header formatting
+    header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+    header_font = Font(bold=True, color='FFFFFF', size=12)
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    
+    header = []
+    for col in columns:
+        cell = WriteOnlyCell(worksheet, value=col)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header.append(cell)
+    worksheet.append(header)
+    
+    row_of = attrgetter(*columns)
+    for movie in data:
+        worksheet.append(row_of(movie))
+    
+    workbook.save(filename)
+    
+    print(f"✅ Saved {len(data)} movies")
+    logger.info(f"Saved {len(data)} movies to {filename}")
 
 # ============================
 # MAIN EXECUTION
 # ============================
-def main():
+async def main():
     """Main scraper"""
     print("\n" + "="*60)
     print("🎬 SkymoviesHD Complete Movie Scraper")
@@ -305,7 +402,6 @@ def main():
     print(f"⏰ Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     logger.info("Starting scraper")
-    session = create_session()
     
     # Checkpoint 1
     print(f"\n🔹 CHECKPOINT 1: Loaded {len(CATEGORIES)} Categories")
@@ -316,19 +412,18 @@ def main():
     print("\n🔹 CHECKPOINT 2: Scraping Movies")
     all_movies = []
     
-    with tqdm(total=len(CATEGORIES), desc="Progress", position=0) as pbar:
-        for idx, category in enumerate(CATEGORIES, 1):
-            pbar.set_description(f"[{idx}/{len(CATEGORIES)}] {category['name'][:30]}")
-            
-            #movies = scrape_category_page(session, category['url'], category['name'])
-            movies = movies = scrape_category_page(session,category['url'],category['name'],max_pages=10,workers=10)
+    async with create_session() as session:
+        movies_by_category = await scrape_categories(session, CATEGORIES, max_pages=10)
+        
+        for category in CATEGORIES:
+            movies = movies_by_category[category['name']]
             all_movies.extend(movies)
-            
-            pbar.update(1)
             print(f"  ✓ {category['name']}: {len(movies)} movies")
-            print(f"  📊 Total: {len(all_movies)}")
-            
-            time.sleep(REQUEST_DELAY)
+        print(f"  📊 Total: {len(all_movies)}")
+        
+        if SCRAPE_MOVIE_DETAILS and all_movies:
+            print("\n🔹 Scraping Movie Details")
+            await scrape_movie_details(session, all_movies)
     
     # Checkpoint 3
     print("\n🔹 CHECKPOINT 3: Saving Data")
@@ -345,16 +440,15 @@ def main():
         print(f"Completed: {datetime.now().strftime('%H:%M:%S')}")
         print("="*60)
         
-        df = pd.DataFrame(all_movies)
         print("\n📊 Category Breakdown:")
-        for cat, count in df['category'].value_counts().items():
+        for cat, count in Counter(m.category for m in all_movies).most_common():
             print(f"  {cat}: {count}")
     else:
         print("⚠️ No movies found")
 
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("\n\n⚠️ Interrupted by user")
     except Exception as e: